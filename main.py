@@ -4,20 +4,10 @@
 import torch
 torch.backends.cudnn.benchmark=True
 
-import torch.nn as nn
-from torch.autograd import Variable
-import torch.optim as optim
-import torch.nn.functional as F
-
 import torchvision.datasets as datasets
-import torchvision.models as models
 import torchvision.transforms as transforms
 
 import argparse 
-import numpy as np
-from random import shuffle
-
-import copy
 
 import sys 
 sys.path.append('./utils')
@@ -34,10 +24,15 @@ from mas import *
 parser = argparse.ArgumentParser(description='Test file')
 parser.add_argument('--use_gpu', default=False, type=bool, help = 'Set the flag if you wish to use the GPU')
 parser.add_argument('--batch_size', default=32, type=int, help = 'The batch size you want to use')
-parser.add_argument('--num_freeze_layers', default=2, type=int, help = 'Number of layers you want to frozen in the feature extractor of the model')
+parser.add_argument('--num_freeze_layers', default=2, type=int, help = 'Number of convolutional layers (from the end) of the feature extractor that you want to train, the rest are frozen')
 parser.add_argument('--num_epochs', default=10, type=int, help='Number of epochs you want to train the model on')
 parser.add_argument('--init_lr', default=0.001, type=float, help='Initial learning rate for training the model')
 parser.add_argument('--reg_lambda', default=0.01, type=float, help='Regularization parameter')
+parser.add_argument('--num_workers', default=None, type=int, help='Number of worker processes per dataloader. Defaults to splitting the CPUs across the train and test dataloaders of all the tasks (at most 4)')
+parser.add_argument('--offload_init_val', action='store_true', help='Set the flag to keep the initial values of the parameters in pinned host memory, freeing GPU memory for larger batches')
+parser.add_argument('--checkpoint_segments', default=0, type=int, help='Number of checkpointed segments of the feature extractor during training and while computing omega (0 disables gradient checkpointing, values above the number of modules of the feature extractor are clamped to it)')
+parser.add_argument('--use_cuda_graph', action='store_true', help='Set the flag to capture the omega computation in a CUDA graph (requires use_gpu)')
+parser.add_argument('--use_dali', action='store_true', help='Set the flag to decode and augment the images on the GPU with NVIDIA DALI (requires use_gpu)')
 
 args = parser.parse_args()
 use_gpu = args.use_gpu
@@ -46,6 +41,15 @@ no_of_layers = args.num_freeze_layers
 num_epochs = args.num_epochs
 lr = args.init_lr
 reg_lambda = args.reg_lambda
+use_dali = args.use_dali and use_gpu
+offload_init_val = args.offload_init_val
+checkpoint_segments = args.checkpoint_segments
+if (checkpoint_segments < 0):
+	parser.error("--checkpoint_segments must be non-negative")
+use_cuda_graph = args.use_cuda_graph
+
+if (use_dali):
+	from dali_utils import *
 
 dloaders_train = []
 dloaders_test = []
@@ -55,8 +59,6 @@ dsets_test = []
 
 num_classes = []
 
-data_path = os.path.join(os.getcwd(), "Data")
-
 data_transforms = {
 	'train': transforms.Compose([
 		transforms.RandomResizedCrop(224),
@@ -78,20 +80,47 @@ data_transforms = {
 data_dir = os.path.join(os.getcwd(), "Data")
 
 
+task_dirs = sorted(os.listdir(data_dir))
+
+#the train and test loaders of every task keep their own workers alive, so share the CPUs between all of them
+num_workers = args.num_workers
+if (num_workers is None):
+	num_workers = min(4, (os.cpu_count() or 1)//(2*len(task_dirs)))
+
+#persistent workers and prefetching are only available for multi-process loading
+loader_kwargs = {'num_workers': num_workers, 'pin_memory': use_gpu}
+if (num_workers > 0):
+	loader_kwargs['persistent_workers'] = True
+	loader_kwargs['prefetch_factor'] = 4
+
 #create the dataloaders for all the tasks
-for tdir in sorted(os.listdir(data_dir)):
+for tdir in task_dirs:
+
+	if (use_dali):
+		#the DALI pipelines decode, crop and normalize the images on the GPU
+		tr_dset_loaders = dali_loader(os.path.join(data_dir, tdir, "train"), batch_size, training = True)
+		te_dset_loaders = dali_loader(os.path.join(data_dir, tdir, "test"), batch_size, training = False)
+
+		#get the sizes
+		temp1 = tr_dset_loaders.dset_size
+		temp2 = te_dset_loaders.dset_size
 
-	#create the image folders objects
-	tr_image_folder = datasets.ImageFolder(os.path.join(data_dir, tdir, "train"), transform = data_transforms['train'])
-	te_image_folder = datasets.ImageFolder(os.path.join(data_dir, tdir, "test"), transform = data_transforms['test'])
+		classes = tr_dset_loaders.classes
 
-	#get the dataloaders
-	tr_dset_loaders = torch.utils.data.DataLoader(tr_image_folder, batch_size=batch_size, shuffle=True, num_workers=4)
-	te_dset_loaders = torch.utils.data.DataLoader(te_image_folder, batch_size=batch_size, shuffle=True, num_workers=4)
+	else:
+		#create the image folders objects
+		tr_image_folder = datasets.ImageFolder(os.path.join(data_dir, tdir, "train"), transform = data_transforms['train'])
+		te_image_folder = task_image_folder(os.path.join(data_dir, tdir, "test"), tr_image_folder.class_to_idx, transform = data_transforms['test'])
 
-	#get the sizes
-	temp1 = len(tr_image_folder) 
-	temp2 = len(te_image_folder)
+		#get the dataloaders
+		tr_dset_loaders = torch.utils.data.DataLoader(tr_image_folder, batch_size=batch_size, shuffle=True, **loader_kwargs)
+		te_dset_loaders = torch.utils.data.DataLoader(te_image_folder, batch_size=batch_size, shuffle=True, **loader_kwargs)
+
+		#get the sizes
+		temp1 = len(tr_image_folder) 
+		temp2 = len(te_image_folder)
+
+		classes = tr_image_folder.classes
 
 
 	#append the dataloaders of these tasks
@@ -99,7 +128,7 @@ for tdir in sorted(os.listdir(data_dir)):
 	dloaders_test.append(te_dset_loaders)
 
 	#get the classes (THIS MIGHT NEED TO BE CORRECTED)
-	num_classes.append(len(tr_image_folder.classes))
+	num_classes.append(len(classes))
 
 
 	#get the sizes array
@@ -110,8 +139,6 @@ for tdir in sorted(os.listdir(data_dir)):
 #get the number of tasks in the sequence
 no_of_tasks = len(dloaders_train)
 
-model = shared_model(models.alexnet(pretrained = True))
-
 #train the model on the given number of tasks
 for task in range(1, no_of_tasks+1):
 	print ("Training the model on task {}".format(task))
@@ -125,7 +152,7 @@ for task in range(1, no_of_tasks+1):
 
 	model = model_init(no_of_classes, use_gpu)
 
-	mas_train(model, task, num_epochs, no_of_layers, no_of_classes, dataloader_train, dataloader_test, dset_size_train, dset_size_test, lr, reg_lambda, use_gpu)
+	mas_train(model, task, num_epochs, no_of_layers, no_of_classes, dataloader_train, dataloader_test, dset_size_train, dset_size_test, lr, reg_lambda, use_gpu, offload_init_val, checkpoint_segments, use_cuda_graph)
 	
 
 print ("The training process on the {} tasks is completed".format(no_of_tasks))
@@ -27,7 +27,7 @@ from optimizer_lib import *
 from model_train import *
 
 
-def mas_train(model, task_no, num_epochs, no_of_layers, no_of_classes, dataloader_train, dataloader_test, dset_size_train, dset_size_test, lr = 0.001, reg_lambda = 0.01, use_gpu = False):
+def mas_train(model, task_no, num_epochs, no_of_layers, no_of_classes, dataloader_train, dataloader_test, dset_size_train, dset_size_test, lr = 0.001, reg_lambda = 0.01, use_gpu = False, offload_init_val = False, checkpoint_segments = 0, use_cuda_graph = False):
 	"""
 	Inputs:
 	1) model: A reference to the model that is being exposed to the data for the task
@@ -39,6 +39,10 @@ def mas_train(model, task_no, num_epochs, no_of_layers, no_of_classes, dataloade
 	6) dset_size_train: The size of the task (size of the dataset belonging to the training task)
 	7) dset_size_test: The size of the task (size of the dataset belonging to the test set)
 	7) use_gpu: Set the flag to `True` if you want to train the model on GPU
+	8) offload_init_val: Set the flag to `True` to keep the initial values of the parameters in pinned host memory
+	9) checkpoint_segments: The number of checkpointed segments the convolutional base is split into during training and 
+	while computing omega. Trades recomputation for activation memory, set it to 0 to disable checkpointing
+	10) use_cuda_graph: Set the flag to `True` to capture the omega computation in a CUDA graph (GPU only)
 
 	Outputs:
 	1) model: Returns a trained model
@@ -46,23 +50,26 @@ def mas_train(model, task_no, num_epochs, no_of_layers, no_of_classes, dataloade
 	Function: Trains the model on a particular task and deals with different tasks in the sequence
 	"""
 
+	#the NHWC layout lets cuDNN pick the tensor core kernels for the convolutions
+	if (use_gpu):
+		model.tmodel.to(memory_format = torch.channels_last)
+
+	#`model_init` builds a fresh model for every task, hence the layers are frozen again for each of them
+	model, freeze_layers = create_freeze_layers(model, no_of_layers)
+
 	#this is the task to which the model is exposed
 	if (task_no == 1):
 		#initialize the reg_params for this task
-		model, freeze_layers = create_freeze_layers(model, no_of_layers)
-		model = init_reg_params(model, use_gpu, freeze_layers)
+		model = init_reg_params(model, use_gpu, freeze_layers, offload_init_val)
 
 	else:
 		#inititialize the reg_params for this task
-		model = init_reg_params_across_tasks(model, use_gpu)
+		model = init_reg_params_across_tasks(model, use_gpu, freeze_layers, offload_init_val)
 
 	#get the optimizer
 	optimizer_sp = local_sgd(model.tmodel.parameters(), reg_lambda, lr)
-	train_model(model, task_no, no_of_classes, optimizer_sp, model_criterion, dataloader_train, dataloader_test, dset_size_train, dset_size_test, num_epochs, use_gpu, lr, reg_lambda)
-
-	if (task_no > 1):
-
-		model = consolidate_reg_params(model, use_gpu)
+	#the omega values are consolidated across the tasks by `train_model` before the model is saved
+	train_model(model, task_no, no_of_classes, optimizer_sp, model_criterion, dataloader_train, dataloader_test, dset_size_train, dset_size_test, num_epochs, use_gpu, lr, reg_lambda, checkpoint_segments, use_cuda_graph)
 
 	return model
 
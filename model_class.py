@@ -38,6 +38,7 @@ class shared_model(nn.Module):
 		super(shared_model, self).__init__()
 		self.tmodel = models.alexnet(pretrained = True)
 		self.reg_params = {}
+		self.reg_views = {}
 
 	def forward(self, x):
 		return self.tmodel(x)
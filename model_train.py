@@ -26,7 +26,7 @@ from mas_utils import *
 from optimizer_lib import *
 
 
-def train_model(model, task_no, num_classes, optimizer, model_criterion, dataloader_train, dataloader_test, dset_size_train, dset_size_test, num_epochs, use_gpu = False, lr = 0.001, reg_lambda = 0.01):
+def train_model(model, task_no, num_classes, optimizer, model_criterion, dataloader_train, dataloader_test, dset_size_train, dset_size_test, num_epochs, use_gpu = False, lr = 0.001, reg_lambda = 0.01, checkpoint_segments = 0, use_cuda_graph = False):
 	"""
 	Inputs:
 	1) model: A reference to the model that is being exposed to the data for the task
@@ -39,6 +39,10 @@ def train_model(model, task_no, num_classes, optimizer, model_criterion, dataloa
 	8) num_epochs: Number of epochs that you wish to train the model for
 	9) use_gpu: Set the flag to `True` if you wish to train on a GPU. Default value: False
 	10) lr: The initial learning rate set for training the model
+	11) reg_lambda: The regularization parameter
+	12) checkpoint_segments: The number of checkpointed segments of the convolutional base, used both for the training epochs 
+	and while computing omega (0 disables checkpointing)
+	13) use_cuda_graph: Set the flag to `True` to replay the omega computation from a CUDA graph
 
 	Outputs:
 	1) model: Return a trained model
@@ -84,7 +88,7 @@ def train_model(model, task_no, num_classes, optimizer, model_criterion, dataloa
 			model = model.load_state_dict(checkpoint['state_dict'])
 			
 			print ("Loading the optimizer")
-			optimizer = local_sgd(model.reg_params, reg_lambda)
+			optimizer = local_sgd(model.tmodel.parameters(), reg_lambda)
 			optimizer = optimizer.load_state_dict(checkpoint['optimizer'])
 			
 			print ("Done")
@@ -100,9 +104,9 @@ def train_model(model, task_no, num_classes, optimizer, model_criterion, dataloa
 		#run the omega accumulation at convergence of the loss function
 		if (epoch == omega_epochs -1):
 			#no training of the model takes place in this epoch
-			optimizer_ft = omega_update(model.reg_params)
+			optimizer_ft = omega_update([param_dict['param_ref'] for param_dict in model.reg_params.values()], model.omega_flat)
 			print ("Updating the omega values for this task")
-			model = compute_omega_grads_norm(model, dataloader_train, optimizer_ft, use_gpu)
+			model = compute_omega_grads_norm(model, dataloader_train, optimizer_ft, device, checkpoint_segments, use_cuda_graph)
 
 			running_loss = 0
 			running_corrects = 0
@@ -115,8 +119,8 @@ def train_model(model, task_no, num_classes, optimizer, model_criterion, dataloa
 				del data
 
 				if (use_gpu):
-					input_data = input_data.to(device)
-					labels = labels.to(device) 
+					input_data = input_data.to(device, non_blocking = True)
+					labels = labels.to(device, non_blocking = True)
 				
 				else:
 					input_data  =  input_data
@@ -162,8 +166,8 @@ def train_model(model, task_no, num_classes, optimizer, model_criterion, dataloa
 				del data
 
 				if (use_gpu):
-					input_data = input_data.to(device)
-					labels = labels.to(device) 
+					input_data = input_data.to(device, non_blocking = True)
+					labels = labels.to(device, non_blocking = True)
 				
 				else:
 					input_data  = Variable(input_data)
@@ -172,7 +176,11 @@ def train_model(model, task_no, num_classes, optimizer, model_criterion, dataloa
 				model.tmodel.to(device)
 				optimizer.zero_grad()
 				
-				output = model.tmodel(input_data)
+				#the activations of the convolutional base are recomputed in the backward pass when checkpointing is enabled
+				if (checkpoint_segments > 0):
+					output = checkpointed_forward(model, input_data, checkpoint_segments)
+				else:
+					output = model.tmodel(input_data)
 				del input_data
 
 				_, preds = torch.max(output, 1)
@@ -211,5 +219,10 @@ def train_model(model, task_no, num_classes, optimizer, model_criterion, dataloa
 				}, epoch_file_name)
 
 
+	#the omega values of this task are added to those of the previous tasks before the reg_params are saved, 
+	#the next task loads them from the disk
+	if (task_no > 1):
+		model = consolidate_reg_params(model, use_gpu)
+
 	#save the model and the performance 
 	save_model(model, task_no, epoch_accuracy)
\ No newline at end of file
@@ -31,6 +31,33 @@ class local_sgd(optim.SGD):
 		if closure is not None:
 			loss = closure()
 
+		#add the gradient of the penalty term for the change in the weights of the regularized parameters. 
+		#reg_params is keyed by the name of the layer and holds a reference to the parameter itself
+		for param_dict in reg_params.values():
+			p = param_dict['param_ref']
+
+			if p.grad is None:
+				continue
+
+			#the penalty uses the importance accumulated over the previous tasks, the omega of the current 
+			#task is only computed once the training on it has finished (and is zero for the first task)
+			omega = param_dict.get('prev_omega', param_dict['omega'])
+			init_val = param_dict['init_val']
+
+			#omega is allocated on the device of the parameter, only an offloaded init_val needs to be moved
+			curr_param_value = p.data
+			init_val = init_val.to(curr_param_value.device, non_blocking = True)
+
+			#get the difference
+			param_diff = curr_param_value - init_val
+
+			#get the gradient for the penalty term for change in the weights of the parameters
+			p.grad.data.addcmul_(param_diff, omega, value = 2*self.reg_lambda)
+
+			del param_diff
+			del omega
+			del init_val
+			del curr_param_value
 		
 		for group in self.param_groups:
 			weight_decay = group['weight_decay']
@@ -44,35 +71,6 @@ class local_sgd(optim.SGD):
 					continue
 
 				d_p = p.grad.data
-
-				if p in reg_params:
-
-					param_dict = reg_params[p]
-
-					omega = param_dict['omega']
-					init_val = param_dict['init_val']
-
-					curr_param_value = p.data
-					curr_param_value = curr_param_value.cuda()
-					
-					init_val = init_val.cuda()
-					omega = omega.cuda()
-
-					#get the difference
-					param_diff = curr_param_value - init_val
-
-					#get the gradient for the penalty term for change in the weights of the parameters
-					local_grad = torch.mul(param_diff, 2*self.reg_lambda*omega)
-					
-					del param_diff
-					del omega
-					del init_val
-					del curr_param_value
-
-					d_p = d_p + local_grad
-					
-					del local_grad
-					
 				
 				if (weight_decay != 0):
 					d_p.add_(weight_decay, p.data)
@@ -96,8 +94,9 @@ class local_sgd(optim.SGD):
 
 class omega_update(optim.SGD):
 
-	def __init__(self, params, lr = 0.001, momentum = 0, dampening = 0, weight_decay = 0, nesterov = False):
+	def __init__(self, params, omega_flat, lr = 0.001, momentum = 0, dampening = 0, weight_decay = 0, nesterov = False):
 		super(omega_update, self).__init__(params, lr, momentum, dampening, weight_decay, nesterov)
+		self.omega_flat = omega_flat
 
 	def __setstate__(self, state):
 		super(omega_update, self).__setstate__(state)
@@ -108,117 +107,47 @@ class omega_update(optim.SGD):
 		if closure is not None:
 			loss = closure()
 
-		for group in self.param_groups:
-			weight_decay = group['weight_decay']
-			momentum = group['momentum']
-			dampening = group['dampening']
-			nesterov = group['nesterov']
-
-			for p in group['params']:
-				if p.grad is None:
-					continue
-
-				if p in reg_params:
+		grads = []
+		omegas = []
 
-					grad_data = p.grad.data
+		for name, param_dict in reg_params.items():
+			p = param_dict['param_ref']
+			if p.grad is None:
+				continue
 
-					#The absolute value of the grad_data that is to be added to omega 
-					grad_data_copy = p.grad.data.clone()
-					grad_data_copy = grad_data_copy.abs()
-					
-					param_dict = reg_params[p]
+			grads.append(p.grad.data)
+			omegas.append(param_dict['omega'])
 
-					omega = param_dict['omega']
-					omega = omega.to(torch.device("cuda:0" if use_gpu else "cpu"))
+		if (len(omegas) == 0):
+			return loss
 
-					current_size = (batch_index+1)*batch_size
-					step_size = 1/float(current_size)
+		current_size = (batch_index+1)*batch_size
+		step_size = 1/float(current_size)
 
-					#Incremental update for the omega
-					omega = omega + step_size*(grad_data_copy - batch_size*(omega))
+		#The absolute value of the gradients that is to be added to omega. The gradients are 
+		#recomputed for every batch, hence they are overwritten in place
+		torch._foreach_abs_(grads)
 
-					param_dict['omega'] = omega
-
-					reg_params[p] = param_dict
+		#Incremental update for the omega, carried out in place since omega is a view of model.omega_flat.
+		#The decay is applied to the flat buffer at once. The omega views share the strides of the parameters 
+		#(and hence of their gradients), so the foreach call adds to all the layers with a single kernel launch
+		self.omega_flat.mul_(1 - batch_size*step_size)
+		torch._foreach_add_(omegas, grads, alpha = step_size)
 
 		return loss
 
 
-class omega_vector_update(optim.SGD):
+class omega_vector_update(omega_update):
+	"""
+	
+	`compute_omega_grads_vector` accumulates the absolute gradients of all the output units into 
+	the grad attribute of the parameters before the step is invoked, hence omega is updated in the 
+	same manner as in the "omega_update" class
+	
+	"""
 
-	def __init__(self, params, lr = 0.001, momentum = 0, dampening = 0, weight_decay = 0, nesterov = False):
-		super(omega_vector_update, self).__init__(params, lr, momentum, dampening, weight_decay, nesterov)
+	def __init__(self, params, omega_flat, lr = 0.001, momentum = 0, dampening = 0, weight_decay = 0, nesterov = False):
+		super(omega_vector_update, self).__init__(params, omega_flat, lr, momentum, dampening, weight_decay, nesterov)
 	
 	def __setstate__(self, state):
 		super(omega_vector_update, self).__setstate__(state)
-
-	def step(self, reg_params, finality, batch_index, batch_size, use_gpu, closure = None):
-		loss = None
-
-		device = torch.device("cuda:0" if use_gpu else "cpu")
-
-		if closure is not None:
-			loss = closure()
-
-		for group in self.param_groups:
-			weight_decay = group['weight_decay']
-			momentum = group['momentum']
-			dampening = group['dampening']
-			nesterov = group['nesterov']
-
-			for p in group['params']:
-				if p.grad is None:
-					continue
-
-				if p in reg_params:
-
-					grad_data = p.grad.data
-
-					#The absolute value of the grad_data that is to be added to omega 
-					grad_data_copy = p.grad.data.clone()
-					grad_data_copy = grad_data_copy.abs()
-					
-					param_dict = reg_params[p]
-
-					if not finality:
-						
-						if 'temp_grad' in reg_params.keys():
-							temp_grad = param_dict['temp_grad']
-						
-						else:
-							temp_grad = torch.FloatTensor(p.data.size()).zero_()
-							temp_grad = temp_grad.to(device)
-						
-						temp_grad = temp_grad + grad_data_copy
-						param_dict['temp_grad'] = temp_grad
-						
-						del temp_data
-
-
-					else:
-						
-						#temp_grad variable
-						temp_grad = param_dict['temp_grad']
-						temp_grad = temp_grad + grad_data_copy
-
-						#omega variable
-						omega = param_dict['omega']
-						omega.to(device)
-
-						current_size = (batch_index+1)*batch_size
-						step_size = 1/float(current_size)
-
-						#Incremental update for the omega  
-						omega = omega + step_size*(temp_grad - batch_size*(omega))
-
-						param_dict['omega'] = omega
-						
-						reg_params[p] = param_dict
-
-						del omega
-						del param_dict
-					
-					del grad_data
-					del grad_data_copy
-
-		return loss
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+
+from __future__ import print_function
+
+import torch
+
+import math
+import os
+
+from nvidia.dali import pipeline_def, fn, types
+from nvidia.dali.plugin.pytorch import DALIGenericIterator, LastBatchPolicy
+
+
+@pipeline_def
+def imagenet_pipe(data_dir, training):
+	"""
+	Inputs
+	1) data_dir: The directory containing one sub folder per class (the same layout ImageFolder expects)
+	2) training: Set the flag to True to apply the random crop and flip used for the training split
+
+	Outputs
+	1) images: The decoded and normalized images in the CHW layout
+	2) labels: The labels of the images
+
+	Function: GPU counterpart of `data_transforms` in main.py. The JPEGs are decoded by nvJPEG and the
+	crop, flip and normalization are carried out on the GPU
+
+	"""
+	jpegs, labels = fn.readers.file(file_root = data_dir, random_shuffle = True, name = "Reader")
+	images = fn.decoders.image(jpegs, device = "mixed", output_type = types.RGB)
+
+	mean = [0.485*255, 0.456*255, 0.406*255]
+	std = [0.229*255, 0.224*255, 0.225*255]
+
+	if (training):
+		images = fn.random_resized_crop(images, size = 224)
+		images = fn.crop_mirror_normalize(images, dtype = types.FLOAT, output_layout = "CHW",
+			mean = mean, std = std, mirror = fn.random.coin_flip())
+
+	else:
+		images = fn.resize(images, resize_shorter = 256)
+		images = fn.crop_mirror_normalize(images, dtype = types.FLOAT, output_layout = "CHW",
+			crop = (224, 224), mean = mean, std = std, mirror = 0)
+
+	return images, labels.gpu()
+
+
+
+class dali_loader(object):
+	"""
+
+	Wraps a DALIGenericIterator so that it yields (inputs, labels) pairs like the torch DataLoader
+	it replaces. The loader resets itself at the end of every epoch and can be iterated repeatedly
+
+	"""
+
+	def __init__(self, data_dir, batch_size, training, num_threads = 4, device_id = 0):
+		pipe = imagenet_pipe(data_dir, training, batch_size = batch_size, num_threads = num_threads, device_id = device_id)
+		pipe.build()
+
+		self.batch_size = batch_size
+		self.dset_size = pipe.epoch_size("Reader")
+
+		#the number of classes is the number of sub folders, which is what the file reader labels by
+		self.classes = sorted(entry for entry in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, entry)))
+
+		self.iterator = DALIGenericIterator(pipe, ["data", "label"], reader_name = "Reader",
+			last_batch_policy = LastBatchPolicy.PARTIAL, auto_reset = True)
+
+	def __iter__(self):
+		for data in self.iterator:
+			yield data[0]["data"], data[0]["label"].squeeze(-1).long()
+
+	def __len__(self):
+		return int(math.ceil(self.dset_size/float(self.batch_size)))
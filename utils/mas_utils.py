@@ -7,6 +7,7 @@ from __future__ import print_function
 import torch
 import torch.nn as nn
 import torch.optim as optim
+import torch.utils.checkpoint
 
 import numpy as np
 import torchvision
@@ -19,14 +20,85 @@ import shutil
 import sys
 
 
-def init_reg_params(model, use_gpu, freeze_layers = []):
+def param_view(model, flat, name):
+	"""
+	Inputs:
+	1) model: A reference to the model whose reg_params are stored in flat buffers
+	2) flat: One of the flat buffers of the model (omega_flat, prev_omega_flat or init_val_flat)
+	3) name: The name of the parameter
+
+	Outputs:
+	1) view: A view of the flat buffer with the shape and the strides (memory format) of the parameter. Writes 
+	to the view update the flat buffer
+
+	"""
+	offset, shape, stride = model.reg_views[name]
+	return flat.as_strided(shape, stride, flat.storage_offset() + offset)
+
+
+def flatten_params(model, named_tensors, total, device, pin_memory = False):
+	"""
+	Inputs:
+	1) model: A reference to the model whose reg_views have been created
+	2) named_tensors: A list of (name, tensor) pairs, one for each entry of `model.reg_views`
+	3) total: The total number of elements across these tensors
+	4) device: The device on which the flat buffer is to be placed
+	5) pin_memory: Set the flag to True to place the buffer in pinned host memory instead of on the device
+
+	Outputs:
+	1) flat: A single 1-D buffer holding a copy of the values of all the tensors
+
+	Function: Copies the tensors into the views of a new flat buffer with one foreach copy. The views share 
+	the strides of the parameters, so the copy of channels_last weights does not fall back to a per tensor copy
+	
+	"""
+	if (pin_memory):
+		flat = torch.empty(total, pin_memory = torch.cuda.is_available())
+	else:
+		flat = torch.empty(total, device = device)
+
+	if (len(named_tensors) > 0):
+		views = [param_view(model, flat, name) for name, _ in named_tensors]
+		torch._foreach_copy_(views, [tensor.detach() for _, tensor in named_tensors], non_blocking = True)
+
+	return flat
+
+
+def create_reg_views(model, named_params):
+	"""
+	Inputs:
+	1) model: A reference to the model that is being trained
+	2) named_params: A list of (name, param) pairs for which omega is calculated
+
+	Outputs:
+	1) total: The total number of elements across these parameters
+
+	Function: Records the offset, the shape and the strides of every parameter within the flat buffers in 
+	`model.reg_views`. The parameters are dense, hence each of them occupies exactly numel elements of the buffers
+	
+	"""
+	reg_views = {}
+	offset = 0
+
+	for name, param in named_params:
+		reg_views[name] = (offset, param.size(), param.stride())
+		offset = offset + param.numel()
+
+	model.reg_views = reg_views
+
+	return offset
+
+
+def init_reg_params(model, use_gpu, freeze_layers = set(), offload_init_val = False):
 	"""
 	Input:
 	1) model: A reference to the model that is being trained
 	2) use_gpu: Set the flag to True if the model is to be trained on the GPU
-	3) freeze_layers: A list containing the layers for which omega is not calculated. Useful in the
+	3) freeze_layers: A set containing the layers for which omega is not calculated. Useful in the
 		case of computational limitations where computing the importance parameters for the entire model
 		is not feasible
+	4) offload_init_val: Set the flag to True to keep the initial values of the parameters in pinned host 
+		memory rather than on the GPU
 
 	Output:
 	1) model: A dictionary containing importance weights (omega), init_val (keep a reference 
@@ -34,43 +106,49 @@ def init_reg_params(model, use_gpu, freeze_layers = []):
 	model with these reg_params is returned.
 
 
-	Function: Initializes the reg_params for a model for the initial task (task = 1)	
+	Function: Initializes the reg_params for a model for the initial task (task = 1). The values of all the 
+	layers are stored in the flat buffers `model.omega_flat` and `model.init_val_flat`, the entries of 
+	reg_params are views into these buffers
 	
 	"""
 	device = torch.device("cuda:0" if use_gpu else "cpu")
 
-	reg_params = {}
+	named_params = [(name, param) for name, param in model.tmodel.named_parameters() if not name in freeze_layers]
+	total = create_reg_views(model, named_params)
 
-	for name, param in model.tmodel.named_parameters():
-		if not name in freeze_layers:
-			
-			print ("Initializing omega values for layer", name)
-			omega = torch.zeros(param.size())
-			omega = omega.to(device)
+	#for first task, omega is initialized to zero
+	model.omega_flat = torch.zeros(total, device = device)
+	#offloading init_val frees device memory of the size of the model, at the cost of copying it back for every training step
+	model.init_val_flat = flatten_params(model, named_params, total, device, pin_memory = offload_init_val)
+
+	reg_params = {}
 
-			init_val = param.data.clone()
-			param_dict = {}
+	for name, param in named_params:
+		print ("Initializing omega values for layer", name)
+		param_dict = {}
 
-			#for first task, omega is initialized to zero
-			param_dict['omega'] = omega
-			param_dict['init_val'] = init_val
+		param_dict['omega'] = param_view(model, model.omega_flat, name)
+		param_dict['init_val'] = param_view(model, model.init_val_flat, name)
+		param_dict['param_ref'] = param
 
-			#the key for this dictionary is the name of the layer
-			reg_params[param] = param_dict
+		#the key for this dictionary is the name of the layer
+		reg_params[name] = param_dict
 
 	model.reg_params = reg_params
 
 	return model
 
 
-def init_reg_params_across_tasks(model, use_gpu, freeze_layers = []):
+def init_reg_params_across_tasks(model, use_gpu, freeze_layers = set(), offload_init_val = False):
 	"""
 	Input:
 	1) model: A reference to the model that is being trained
 	2) use_gpu: Set the flag to True if the model is to be trained on the GPU
-	3) freeze_layers: A list containing the layers for which omega is not calculated. Useful in the
+	3) freeze_layers: A set containing the layers for which omega is not calculated. Useful in the
 		case of computational limitations where computing the importance parameters for the entire model
 		is not feasible
+	4) offload_init_val: Set the flag to True to keep the initial values of the parameters in pinned host 
+		memory rather than on the GPU
 
 	Output:
 	1) model: A dictionary containing importance weights (omega), init_val (keep a reference 
@@ -78,41 +156,50 @@ def init_reg_params_across_tasks(model, use_gpu, freeze_layers = []):
 	model with these reg_params is returned.
 
 
-	Function: Initializes the reg_params for a model for other tasks in the sequence (task != 1)	
+	Function: Initializes the reg_params for a model for other tasks in the sequence (task != 1). The omega
+	values of the previous tasks are gathered in the flat buffer `model.prev_omega_flat`
 	"""
 
 	#Get the reg_params for the model 
 	
 	device = torch.device("cuda:0" if use_gpu else "cpu")
 
-	reg_params = model.reg_params
+	prev_reg_params = model.reg_params
 
-	for name, param in model.tmodel.named_parameters():
-		
-		if not name in freeze_layers:
+	#the classification head (the last classifier module) is specific to a task and is never regularized, even 
+	#when the new head has the same shape as the previous one
+	head_prefix = "classifier.{}.".format(len(model.tmodel.classifier) - 1)
 
-			if param in reg_params:
-				param_dict = reg_params[param]
-				print ("Initializing the omega values for layer for the new task", name)
-				
-				#Store the previous values of omega
-				prev_omega = param_dict['omega']
-				
-				#Initialize a new omega
-				new_omega = torch.zeros(param.size())
-				new_omega = new_omega.to(device)
+	#the shared layers are matched by name, a layer whose shape changed starts afresh
+	named_params = [(name, param) for name, param in model.tmodel.named_parameters() 
+		if not name in freeze_layers and not name.startswith(head_prefix) and name in prev_reg_params 
+		and prev_reg_params[name]['omega'].size() == param.size()]
+	total = create_reg_views(model, named_params)
 
-				init_val = param.data.clone()
-				init_val = init_val.to(device)
+	#Store the previous values of omega
+	model.prev_omega_flat = flatten_params(model, [(name, prev_reg_params[name]['omega']) for name, _ in named_params], total, device)
 
-				param_dict['prev_omega'] = prev_omega
-				param_dict['omega'] = new_omega
+	#Initialize a new omega
+	model.omega_flat = torch.zeros(total, device = device)
 
-				#store the initial values of the parameters
-				param_dict['init_val'] = init_val
+	#store the initial values of the parameters
+	model.init_val_flat = flatten_params(model, named_params, total, device, pin_memory = offload_init_val)
+
+	reg_params = {}
 
-				#the key for this dictionary is the name of the layer
-				reg_params[param] =  param_dict
+	for name, param in named_params:
+		param_dict = prev_reg_params[name]
+		print ("Initializing the omega values for layer for the new task", name)
+
+		param_dict['prev_omega'] = param_view(model, model.prev_omega_flat, name)
+		param_dict['omega'] = param_view(model, model.omega_flat, name)
+		param_dict['init_val'] = param_view(model, model.init_val_flat, name)
+
+		#the reg_params may have been loaded from the disk, point them to the parameters of this model
+		param_dict['param_ref'] = param
+
+		#the key for this dictionary is the name of the layer
+		reg_params[name] =  param_dict
 
 	model.reg_params = reg_params
 
@@ -137,35 +224,99 @@ def consolidate_reg_params(model, use_gpu):
 	#Get the reg_params for the model 
 	reg_params = model.reg_params
 
-	for name, param in model.tmodel.named_parameters():
-		if param in reg_params:
-			param_dict = reg_params[param]
-			print ("Consolidating the omega values for layer", name)
-			
-			#Store the previous values of omega
-			prev_omega = param_dict['prev_omega']
-			new_omega = param_dict['omega']
-
-			new_omega = torch.add(prev_omega, new_omega)
-			del param_dict['prev_omega']
-			
-			param_dict['omega'] = new_omega
-
-			#the key for this dictionary is the name of the layer
-			reg_params[param] = param_dict
+	#the omega values of all the layers are consolidated at once, the views in reg_params see the result
+	model.omega_flat.add_(model.prev_omega_flat)
+	del model.prev_omega_flat
+
+	for name, param_dict in reg_params.items():
+		print ("Consolidating the omega values for layer", name)
+		param_dict.pop('prev_omega', None)
 
 	model.reg_params = reg_params
 
 	return model
 
 
-def compute_omega_grads_norm(model, dataloader, optimizer, use_gpu):
+def checkpointed_forward(model, inputs, segments):
+	"""
+	Inputs:
+	1) model: A reference to the model
+	2) inputs: A batch of inputs
+	3) segments: The number of segments the convolutional base (features) is split into
+
+	Outputs:
+	1) outputs: The outputs of the model, identical to `model.tmodel(inputs)`
+
+	Function: Forward pass of the Alexnet model that only stores the activations at the boundaries of the 
+	segments of the convolutional base, the rest are recomputed during the backward pass
+	
+	"""
+	#there cannot be more segments than there are modules in the convolutional base
+	segments = min(segments, len(model.tmodel.features))
+	x = torch.utils.checkpoint.checkpoint_sequential(model.tmodel.features, segments, inputs, use_reentrant = False)
+	x = model.tmodel.avgpool(x)
+	x = torch.flatten(x, 1)
+
+	return model.tmodel.classifier(x)
+
+
+def capture_omega_graph(model, static_inputs):
+	"""
+	Inputs:
+	1) model: A reference to the model for which omega is to be calculated
+	2) static_inputs: The (device) tensor the batches are copied into before the graph is replayed
+
+	Outputs:
+	1) graph: A CUDA graph of the forward and backward pass of `compute_omega_grads_norm`. Every replay 
+	recomputes the .grad buffers of the parameters in reg_params for the batch held in static_inputs
+
+	Function: Warms up the forward and backward pass on a side stream and captures them in a CUDA graph, 
+	removing the Python and autograd overhead of every subsequent batch 
+	
+	"""
+	params = [param_dict['param_ref'] for param_dict in model.reg_params.values()]
+
+	#the warm up has to take place on a side stream before the capture
+	stream = torch.cuda.Stream()
+	stream.wait_stream(torch.cuda.current_stream())
+
+	with torch.cuda.stream(stream):
+		for _ in range(3):
+			for param in params:
+				param.grad = None
+
+			with torch.autocast("cuda", dtype = torch.float16, cache_enabled = False):
+				outputs = model.tmodel(static_inputs)
+			outputs.backward(gradient = 2*outputs.detach())
+
+	torch.cuda.current_stream().wait_stream(stream)
+
+	#the .grad buffers are allocated during the capture so that they are owned by the graph
+	for param in params:
+		param.grad = None
+
+	graph = torch.cuda.CUDAGraph()
+	with torch.cuda.graph(graph):
+		with torch.autocast("cuda", dtype = torch.float16, cache_enabled = False):
+			outputs = model.tmodel(static_inputs)
+		outputs.backward(gradient = 2*outputs.detach())
+
+	return graph
+
+
+def compute_omega_grads_norm(model, dataloader, optimizer, device, checkpoint_segments = 0, use_cuda_graph = False):
 	"""
 	Inputs:
 	1) model: A reference to the model for which omega is to be calculated
 	2) dataloader: A dataloader to feed the data to the model
 	3) optimizer: An instance of the "omega_update" class
-	4) use_gpu: Flag is set to True if the model is to be trained on the GPU
+	4) device: The device on which the model is trained
+	5) checkpoint_segments: The number of checkpointed segments the convolutional base is split into. The 
+		activations within a segment are recomputed during the backward pass instead of being stored, which 
+		allows for larger batches. Set it to 0 to disable checkpointing
+	6) use_cuda_graph: Set the flag to True to capture the forward and backward pass in a CUDA graph that is 
+		replayed for every batch of the same size. Only used on the GPU, where it takes precedence over 
+		checkpoint_segments and the compiled forward pass
 
 	Outputs:
 	1) model: An updated reference to the model is returned
@@ -177,53 +328,99 @@ def compute_omega_grads_norm(model, dataloader, optimizer, use_gpu):
 	#Alexnet object
 	model.tmodel.eval()
 
-	index = 0
-	for data in dataloader:
-		
-		#get the inputs and labels
-		inputs, labels = data
+	#gradients are only calculated for the parameters that have an omega, the .grad buffers of the other 
+	#(frozen) parameters are never allocated. The flags are restored once omega has been computed
+	requires_grad = {}
+	for name, param in model.tmodel.named_parameters():
+		requires_grad[name] = param.requires_grad
+		param.requires_grad_(name in model.reg_params)
 
-		if(use_gpu):
-			device = torch.device("cuda:0" if use_gpu else "cpu")
-			inputs, labels = inputs.to(device), labels.to(device)
+	try:
+		use_gpu = (device.type == "cuda")
+		use_cuda_graph = use_cuda_graph and use_gpu
 
-		#Zero the parameter gradients
-		optimizer.zero_grad()
+		#the model is converted to channels_last in `mas_train` when it is trained on the GPU
+		memory_format = torch.channels_last if use_gpu else torch.preserve_format
 
-		#get the function outputs
-		outputs = model.tmodel(inputs)
-		del inputs
+		#on the GPU the forward pass is compiled once per task and run in half precision. Only the 
+		#magnitudes of the gradients are needed for omega, hence no loss scaling is carried out
+		forward = model.tmodel
+		if (checkpoint_segments > 0 and not use_cuda_graph):
+			forward = lambda inputs: checkpointed_forward(model, inputs, checkpoint_segments)
 
-		#compute the sqaured l2 norm of the function outputs
-		l2_norm = torch.norm(outputs, 2, dim = 1)
-		del outputs
+		if (use_gpu and not use_cuda_graph):
+			forward = torch.compile(forward)
+
+		graph = None
+		static_inputs = None
 
-		squared_l2_norm = l2_norm**2
-		del l2_norm
+		index = 0
+		for data in dataloader:
 		
-		sum_norm = torch.sum(squared_l2_norm)
-		del squared_l2_norm
+			#get the inputs and labels
+			inputs, labels = data
 
-		#compute gradients for these parameters
-		sum_norm.backward()
+			#a no-op for the tensors that are already on the device
+			inputs = inputs.to(device, memory_format = memory_format, non_blocking = True)
+			labels = labels.to(device, non_blocking = True)
 
-		#optimizer.step computes the omega values for the new batches of data
-		optimizer.step(model.reg_params, index, labels.size(0), use_gpu)
-		del labels
+			#the graph is captured on the first batch and replayed for all the batches of the same size
+			if (use_cuda_graph and graph is None):
+				static_inputs = inputs.clone()
+				graph = capture_omega_graph(model, static_inputs)
+
+			if (graph is not None and inputs.size() == static_inputs.size()):
+				#the replay refills the .grad buffers captured in the graph, they must not be reset here
+				static_inputs.copy_(inputs, non_blocking = True)
+				del inputs
+
+				graph.replay()
+
+				#optimizer.step computes the omega values for the new batches of data
+				optimizer.step(model.reg_params, index, labels.size(0), use_gpu)
+				del labels
+
+				index = index + 1
+				continue
+
+			#Zero the parameter gradients. Once a graph is captured the .grad buffers belong to it and are zeroed in place
+			optimizer.zero_grad(set_to_none = graph is None)
+
+			#get the function outputs
+			with torch.autocast("cuda", dtype = torch.float16, enabled = use_gpu):
+				outputs = forward(inputs)
+			del inputs
+
+			#compute gradients for these parameters. The gradient of the sqaured l2 norm of the function outputs 
+			#(summed over the batch) w.r.t. the outputs is 2*outputs, it is backpropagated directly rather than 
+			#computing the norm first
+			outputs.backward(gradient = 2*outputs.detach())
+			del outputs
+
+			#optimizer.step computes the omega values for the new batches of data
+			optimizer.step(model.reg_params, index, labels.size(0), use_gpu)
+			del labels
 		
-		index = index + 1
+			index = index + 1
+
+	finally:
+		#the flags are restored even if the compilation, the capture or the dataloader fails
+		for name, param in model.tmodel.named_parameters():
+			param.requires_grad_(requires_grad[name])
 
 	return model
 
 
 #need a different function for grads vector
-def compute_omega_grads_vector(model, dataloader, optimizer, use_gpu):
+def compute_omega_grads_vector(model, dataloader, optimizer, use_gpu, chunk_size = 8):
 	"""
 	Inputs:
 	1) model: A reference to the model for which omega is to be calculated
 	2) dataloader: A dataloader to feed the data to the model
-	3) optimizer: An instance of the "omega_update" class
+	3) optimizer: An instance of the "omega_vector_update" class
 	4) use_gpu: Flag is set to True if the model is to be trained on the GPU
+	5) chunk_size: The number of output units that are backpropagated together. Larger values are faster
+		but hold the gradients of chunk_size units for every parameter in memory at once
 
 	Outputs:
 	1) model: An updated reference to the model is returned
@@ -235,46 +432,55 @@ def compute_omega_grads_vector(model, dataloader, optimizer, use_gpu):
 	"""
 
 	#Alexnet object
-	model.tmodel.train(False)
-	model.tmodel.eval(True)
+	model.tmodel.eval()
+
+	device = torch.device("cuda:0" if use_gpu else "cpu")
+
+	#only the parameters that have an omega associated with them are differentiated
+	params = [param_dict['param_ref'] for param_dict in model.reg_params.values()]
 
 	index = 0
 
-	for dataloader in dset_loaders:
-		for data in dataloader:
-			
-			#get the inputs and labels
-			inputs, labels = data
+	for data in dataloader:
+		
+		#get the inputs and labels
+		inputs, labels = data
 
-			if(use_gpu):
-				device = torch.device("cuda:0")
-				inputs, labels = inputs.to(device), labels.to(device)
+		if(use_gpu):
+			inputs, labels = inputs.to(device, non_blocking = True), labels.to(device, non_blocking = True)
 
-			#Zero the parameter gradients
-			optimizer.zero_grad()
+		#Zero the parameter gradients
+		optimizer.zero_grad()
 
-			#get the function outputs
-			outputs = model.tmodel(inputs)
-
-			for unit_no in range(0, outputs.size(1)):
-				ith_node = outputs[:, unit_no]
-				targets = torch.sum(ith_node)
-
-				#final node in the layer
-				if(node_no == outputs.size(1)-1):
-					targets.backward()
-				else:
-					#This retains the computational graph for further computations 
-					targets.backward(retain_graph = True)
-
-				optimizer.step(model.reg_params, False, index, labels.size(0), use_gpu)
-				
-				#necessary to compute the correct gradients for each batch of data
-				optimizer.zero_grad()
-
-			
-			optimizer.step(model.reg_params, True, index, labels.size(0), use_gpu)
-			index = index + 1
+		#get the function outputs summed over the batch, a single forward pass serves all the output units
+		outputs = model.tmodel(inputs).sum(0)
+		del inputs
+
+		#each row selects one output unit, the rows of a chunk are backpropagated in one batched pass
+		basis = torch.eye(outputs.size(0), dtype = outputs.dtype, device = outputs.device)
+
+		for param in params:
+			param.grad = torch.zeros_like(param)
+
+		for start in range(0, basis.size(0), chunk_size):
+			#the graph is only retained until the last chunk of output units has been backpropagated
+			last_chunk = (start + chunk_size >= basis.size(0))
+			unit_grads = torch.autograd.grad(outputs, params, grad_outputs = basis[start:start + chunk_size], 
+				retain_graph = not last_chunk, is_grads_batched = True)
+
+			#each gradient has a leading dimension over the output units of the chunk
+			for param, unit_grad in zip(params, unit_grads):
+				param.grad.add_(unit_grad.abs().sum(0))
+
+			del unit_grads
+
+		del outputs
+
+		#optimizer.step computes the omega values for the new batches of data
+		optimizer.step(model.reg_params, index, labels.size(0), use_gpu)
+		del labels
+
+		index = index + 1
 
 	return model
 
@@ -286,8 +492,8 @@ def sanity_model(model):
 		
 		print (name)
 		
-		if param in model.reg_params:
-			param_dict = model.reg_params[param]
+		if name in model.reg_params:
+			param_dict = model.reg_params[name]
 			omega = param_dict['omega']
 
 			print ("Max omega is", omega.max())
@@ -301,53 +507,33 @@ def create_freeze_layers(model, no_of_layers = 2):
 	"""
 	Inputs
 	1) model: A reference to the model
-	2) no_of_layers: The number of convolutional layers that you want to freeze in the convolutional base of 
-		Alexnet model. Default value is 2 
+	2) no_of_layers: The number of convolutional layers (counted from the end) that you want to train in the 
+		convolutional base of Alexnet model, the rest are frozen. Set it to 0 to train the entire model. Default value is 2 
 
 	Outputs
 	1) model: An updated reference to the model with the requires_grad attribute of the 
 			  parameters of the freeze_layers set to False 
-	2) freeze_layers: Creates a list of layers that will not be involved in the training process
+	2) freeze_layers: Creates a set of the parameters (by name) that will not be involved in the training process
 
-	Function: This function creates the freeze_layers list which is then passed to the `compute_omega_grads_norm`
-	function which then checks the list to see if the omegas need to be calculated for the parameters of these layers  
+	Function: This function creates the freeze_layers set which is then passed to the `compute_omega_grads_norm`
+	function which then checks the set to see if the omegas need to be calculated for the parameters of these layers  
 	
 	"""
 	
-	#The require_grad attribute for the parameters of the classifier layer is set to True by default 
-	for param in model.tmodel.classifier.parameters():
-		param.requires_grad = True
-
-	for param in model.tmodel.features.parameters():
-		param.requires_grad = False
-
-	#return an empty list if you want to train the entire model
-	if (no_of_layers == 0):
-		return []
-
-	temp_list = []
-	freeze_layers = []
-
-	#get the keys for the conv layers in the model
-	for key in model.tmodel.features._modules:
-		if (type(model.tmodel.features._modules[key]) == torch.nn.modules.conv.Conv2d):
-			temp_list.append(key)
-	
-	num_of_frozen_layers = len(temp_list) - no_of_layers
+	#the conv layers of the convolutional base in the order of the forward pass
+	conv_modules = [name for name, module in model.tmodel.features.named_modules() if isinstance(module, nn.Conv2d)]
 
-	#set the requires_grad attribute to True for the layers you want to be trainable
-	for num in range(0, num_of_frozen_layers):
-		#pick the layers from the end
-		temp_key = temp_list[num]
-		
-		for param in model.tmodel.features[int(temp_key)].parameters():
-			param.requires_grad = True
+	#pick the trainable layers from the end, all of them are trained if no_of_layers is 0
+	trainable_prefixes = tuple("features.{}.".format(name) for name in conv_modules[-no_of_layers:])
 
-		name_1 = 'features.' + temp_key + '.weight'
-		name_2 = 'features.' + temp_key + '.bias'
+	#the classifier is always trained, every other parameter outside of the trainable conv layers is frozen
+	freeze_layers = set()
 
-		freeze_layers.append(name_1)
-		freeze_layers.append(name_2)
+	for name, param in model.tmodel.named_parameters():
+		trainable = name.startswith("classifier.") or name.startswith(trainable_prefixes)
+		param.requires_grad = trainable
 
+		if not trainable:
+			freeze_layers.add(name)
 
-	return [model, freeze_layers]
\ No newline at end of file
+	return [model, freeze_layers]
@@ -15,7 +15,6 @@ from torchvision import datasets, models, transforms
 import copy
 import os
 import shutil
-import pickle
 
 import sys
 sys.path.append('../')
@@ -23,6 +22,25 @@ sys.path.append('../')
 from model_class import *
 
 
+class task_image_folder(datasets.ImageFolder):
+	"""
+	
+	An ImageFolder that takes the classes of the task from a split that has already been scanned (the 
+	train split) instead of listing the class folders again. This also guarantees that the train and 
+	test splits of a task use the same class to label mapping
+
+	"""
+
+	def __init__(self, root, class_to_idx, transform = None):
+		self.task_class_to_idx = class_to_idx
+		super(task_image_folder, self).__init__(root, transform = transform)
+
+	def find_classes(self, directory):
+		classes = sorted(self.task_class_to_idx, key = self.task_class_to_idx.get)
+		return classes, self.task_class_to_idx
+
+
+
 def exp_lr_scheduler(optimizer, epoch, init_lr=0.0008, lr_decay_epoch=20):
 	"""
 	Decay learning rate by a factor of 0.1 every lr_decay_epoch epochs.
@@ -187,7 +205,7 @@ def model_init(no_classes, use_gpu = False):
 	"""
 
 	path = os.path.join(os.getcwd(), "models", "shared_model.pth")
-	path_to_reg = os.path.join(os.getcwd(), "models", "reg_params.pickle")
+	path_to_reg = os.path.join(os.getcwd(), "models", "reg_params.pth")
 
 	pre_model = models.alexnet(pretrained = True)
 	model = shared_model(pre_model)
@@ -204,14 +222,14 @@ def model_init(no_classes, use_gpu = False):
 	#add the last classfication head to the shared model
 	model.tmodel.classifier.add_module('6', nn.Linear(in_features, no_classes))
 
-	#load the reg_params stored
+	device = torch.device("cuda:0" if use_gpu else "cpu")
+
+	#load the reg_params stored, directly onto the device the model is trained on
 	if os.path.isfile(path_to_reg):
-		with open(path_to_reg, 'rb') as handle:
-			reg_params = pickle.load(handle)
+		reg_params = torch.load(path_to_reg, map_location = device)
 
 		model.reg_params = reg_params
 
-	device = torch.device("cuda:0" if use_gpu else "cpu")
 	model.train(True)
 	model.to(device)
 
@@ -244,12 +262,14 @@ def save_model(model, task_no, epoch_accuracy):
 	ref.fc.weight.data = model.tmodel.classifier[-1].weight.data
 	ref.fc.bias.data = model.tmodel.classifier[-1].bias.data
 
-	#save the reg_params
-	reg_params = model.reg_params
+	#save the reg_params, the references to the parameters are restored by `init_reg_params_across_tasks`
+	reg_params = {}
+	for name, param_dict in model.reg_params.items():
+		reg_params[name] = {key: value for key, value in param_dict.items() if key != 'param_ref'}
 
-	f = open(os.path.join(os.getcwd(), "models", "reg_params.pickle"), 'wb')
-	pickle.dump(reg_params, f)
-	f.close()
+	#the entries of reg_params are views into flat buffers, torch.save stores each shared buffer only once 
+	#whereas pickle would write a copy of the whole buffer for every view
+	torch.save(reg_params, os.path.join(os.getcwd(), "models", "reg_params.pth"))
 
 	#save tge model
 	del model.tmodel.classifier[-1]